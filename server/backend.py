@@ -1,110 +1,319 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
-import requests
-import tempfile
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+from contextlib import asynccontextmanager
+import asyncio
+import httpx
 import os
-import time
+import gzip
+import hashlib
 import logging
-from PyPDF2 import PdfReader
-import openai
-from openai import OpenAI
-from openai._base_client import SyncHttpxClientWrapper
-import json
+import threading
+import time
+import uuid
+import pymupdf
+from openai import AsyncOpenAI
+import orjson
 import datetime
+from cachetools import LRUCache, TTLCache
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Gauge, Histogram, generate_latest
 from dotenv import load_dotenv
+from pdf_pages import extract_page_range
+from tenacity import (
+    retry,
+    retry_if_exception,
+    stop_after_attempt,
+    wait_exponential_jitter,
+)
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Create temp directory for files
-TEMP_DIR = tempfile.mkdtemp()
-logger.info(f"Using temporary directory: {TEMP_DIR}")
-
-app = FastAPI()
-
+# Production gets real environment variables; .env is a local convenience.
+# Load it before any os.getenv below so every setting can come from it.
+if os.getenv("ENV") != "prod":
+    load_dotenv()
 
-# Fix OpenAI's client wrapper
-class CustomHttpxClientWrapper(SyncHttpxClientWrapper):
-    def __init__(self, *args, **kwargs):
-        kwargs.pop("proxies", None)  # Remove unsupported `proxies` argument
-        super().__init__(*args, **kwargs)
+WEBHOOK_URL = os.getenv(
+    "WEBHOOK_URL", "https://rnd-assignment.automations-3d6.workers.dev/"
+)
+# Opt-in: set WEBHOOK_GZIP=true once the receiver is known to decode gzipped
+# request bodies. A rejection is a 4xx, which is not retried.
+WEBHOOK_GZIP = os.getenv("WEBHOOK_GZIP", "false").lower() == "true"
+
+# Bounded webhook queue drained by a fixed pool of workers
+WEBHOOK_QUEUE_SIZE = 1000
+WEBHOOK_WORKERS = 8
+
+# Shared HTTP client so downloads and webhooks reuse pooled connections
+http_client = None
+webhook_queue = None
+
+WEBHOOK_QUEUE_DEPTH = Gauge("webhook_queue_depth", "Webhooks waiting to be sent")
+WEBHOOK_QUEUE_DEPTH.set_function(lambda: webhook_queue.qsize() if webhook_queue else 0)
+WEBHOOK_DROPPED = Counter("webhook_dropped_total", "Webhooks dropped because the queue was full")
+WEBHOOK_FAILURES = Counter("webhook_failures_total", "Webhooks that could not be delivered")
+WEBHOOK_LATENCY = Histogram("webhook_processing_seconds", "Time spent sending a webhook")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global http_client, webhook_queue, pdf_page_pool, resume_encoding_loader
+    if resume_encoding_loader is None:
+        # Daemon thread so a slow download never holds up startup or shutdown
+        resume_encoding_loader = threading.Thread(target=load_resume_encoding, daemon=True)
+        resume_encoding_loader.start()
+    http_client = httpx.AsyncClient(
+        http2=True,
+        timeout=30,
+        limits=httpx.Limits(max_connections=100, max_keepalive_connections=20),
+    )
+    webhook_queue = asyncio.Queue(maxsize=WEBHOOK_QUEUE_SIZE)
+    workers = [asyncio.create_task(webhook_worker()) for _ in range(WEBHOOK_WORKERS)]
+    resume_batcher.start()
+    if PARALLEL_PAGE_THRESHOLD is not None and PDF_PAGE_WORKERS > 1:
+        # forkserver: never fork this multi-threaded server process directly
+        pdf_page_pool = ProcessPoolExecutor(
+            max_workers=PDF_PAGE_WORKERS,
+            mp_context=multiprocessing.get_context("forkserver"),
+        )
+    try:
+        yield
+    finally:
+        await resume_batcher.stop()
+        for worker in workers:
+            worker.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+        await http_client.aclose()
+        if pdf_page_pool is not None:
+            pdf_page_pool.shutdown(cancel_futures=True)
+            pdf_page_pool = None
 
 
-openai._base_client.SyncHttpxClientWrapper = CustomHttpxClientWrapper
+app = FastAPI(lifespan=lifespan)
 
-load_dotenv()  # Loads variables from .env into environment
 api_key = os.getenv('OPENAI_API_KEY')
+openai_client = AsyncOpenAI(api_key=api_key)
+OPENAI_MODEL = "gpt-3.5-turbo"
+OPENAI_MAX_OUTPUT_TOKENS = 4096  # Model limit on completion length
+RESUME_OUTPUT_TOKENS = 1500  # Completion budget per parsed resume
+
+# Only the start of a resume carries useful signal; cap what we send
+MAX_RESUME_TOKENS = 6000
+MAX_RESUME_CHARS = 24000  # Fallback when tiktoken can't be used
+
+# Micro-batching of OpenAI calls when resumes arrive in bursts
+# Every resume in a batch keeps its own output budget, which the model's
+# completion limit caps at 2. Batches stay small so no resume waits long on
+# the others' output.
+RESUME_BATCH_SIZE = OPENAI_MAX_OUTPUT_TOKENS // RESUME_OUTPUT_TOKENS
+RESUME_BATCH_WAIT = 0.25  # seconds
+RESUME_BATCH_MAX_CHARS = 32000  # Keeps a batch well inside the context window
+
+# tiktoken downloads its BPE file on first use unless TIKTOKEN_CACHE_DIR
+# points at a pre-populated cache (bake one into the image to skip the
+# download). It is loaded on a background thread at startup; until then, or
+# if it fails, resumes are truncated by characters.
+resume_encoding = None
+resume_encoding_loader = None
+
+
+def load_resume_encoding():
+    global resume_encoding
+    try:
+        import tiktoken
+        resume_encoding = tiktoken.encoding_for_model(OPENAI_MODEL)
+    except Exception as e:  # Not installed, or encoding files unavailable
+        logger.warning(f"tiktoken unavailable, truncating resumes by characters: {e}")
+
+# Bump whenever RESUME_PARSER_PROMPT or the model settings change so stale
+# cache entries are not served
+PROMPT_VERSION = "v1"
+
+# Parsed resumes (as serialized JSON) keyed by URL and by resume text hash
+resume_cache = TTLCache(maxsize=10_000, ttl=86400)
+
+# Extracted text keyed by SHA-256 of the PDF bytes
+pdf_text_cache = LRUCache(maxsize=512)
+
+# Optional: very long PDFs can be split into page ranges and extracted in
+# parallel. PyMuPDF is not thread-safe, so each range runs in its own process
+# with its own document handle, and every worker re-parses the document. No
+# gain has been measured yet, so the pool is off unless PDF_PARALLEL_MIN_PAGES
+# is set (and the host has more than one core).
+PARALLEL_PAGE_THRESHOLD = (
+    int(os.environ["PDF_PARALLEL_MIN_PAGES"]) if os.getenv("PDF_PARALLEL_MIN_PAGES") else None
+)
+PDF_PAGE_WORKERS = min(4, os.cpu_count() or 1)
+pdf_page_pool = None
 
 class ResumeLink(BaseModel):
     url: str
 
 
-def download_pdf(url: str) -> str:
+def _extract_pages_parallel(pool, content: bytes, page_count: int) -> str:
+    step = -(-page_count // PDF_PAGE_WORKERS)  # Ceiling division
+    futures = [
+        pool.submit(extract_page_range, content, start, min(start + step, page_count))
+        for start in range(0, page_count, step)
+    ]
+    return "\n".join(future.result() for future in futures)
+
+
+def extract_text(content: bytes) -> str:
+    # Read the global once; the lifespan may clear it while we run
+    pool = pdf_page_pool
+    # Parse straight from memory, no temp file round-trip
+    with pymupdf.open(stream=content, filetype="pdf") as doc:
+        if pool is not None and doc.page_count >= PARALLEL_PAGE_THRESHOLD:
+            text = _extract_pages_parallel(pool, content, doc.page_count)
+        else:
+            text = "\n".join(page.get_text("text") for page in doc)
+
+    logger.info(f"Extracted {len(text)} characters from PDF")
+    return text.strip()
+
+
+async def fetch_and_extract(url: str) -> str:
     try:
         logger.info(f"Downloading PDF from: {url}")
-        # Add timeout to avoid hanging
-        response = requests.get(url, timeout=30)
+        response = await http_client.get(url)
         response.raise_for_status()
-
-        # Use a unique filename in temp directory
-        filename = os.path.join(TEMP_DIR, f"resume_{int(time.time())}.pdf")
-        with open(filename, "wb") as f:
-            f.write(response.content)
-
-        logger.info(f"PDF downloaded successfully to {filename}")
-        return filename
-    except requests.RequestException as e:
+        logger.info(f"PDF downloaded successfully ({len(response.content)} bytes)")
+    except httpx.HTTPError as e:
         logger.error(f"Error downloading PDF: {e}")
         raise HTTPException(status_code=400, detail=f"Error downloading file: {e}")
 
+    pdf_hash = hashlib.sha256(response.content).digest()
+    cached = pdf_text_cache.get(pdf_hash)
+    if cached is not None:
+        logger.info("PDF text cache hit")
+        return cached
 
-def read_pdf(file_path):
     try:
-        logger.info(f"Reading PDF from {file_path}")
-        reader = PdfReader(file_path)
-        text = ""
-
-        for page in reader.pages:
-            text += page.extract_text() + "\n"
-
-        logger.info(f"Extracted {len(text)} characters from PDF")
-        return text.strip()
+        # CPU-bound, keep it off the event loop
+        text = await run_in_threadpool(extract_text, response.content)
+        pdf_text_cache[pdf_hash] = text
+        return text
     except Exception as e:
         logger.error(f"Error reading PDF: {e}")
         raise HTTPException(status_code=500, detail=f"Error reading PDF file: {e}")
 
 
-def ats_extractor(resume_data):
+# System prompt for resume parsing. Kept byte-for-byte stable and above
+# 1024 tokens so OpenAI's automatic prompt caching can reuse the prefix;
+# only the resume text (user message) changes between calls.
+RESUME_PARSER_PROMPT = """
+You are an AI bot designed to act as a professional for parsing resumes. You are given a resume and your job is to extract the following information:
+1. Full Name
+2. Email ID
+3. GitHub Portfolio
+4. LinkedIn ID
+5. Employment Details (with company names, positions, and dates)
+6. Technical Skills (as array of strings)
+7. Soft Skills (as array of strings)
+8. Education (with institution names, degrees, and dates)
+
+Return the extracted information in JSON format only, with keys: fullName, email, github, linkedin, employment, technicalSkills, softSkills, education.
+
+Output rules:
+- "fullName", "email", "github" and "linkedin" are strings. Use an empty string when the resume does not contain the value. Never invent contact details.
+- "github" and "linkedin" should be full URLs when the resume gives a URL, otherwise the username exactly as written.
+- "employment" is an array of objects with keys: company, position, startDate, endDate. Use "Present" for ongoing roles. Keep dates as written in the resume (e.g. "Jan 2021", "2019").
+- "technicalSkills" lists programming languages, frameworks, tools, platforms and technical methods. One skill per string, no duplicates.
+- "softSkills" lists interpersonal and professional skills such as communication or leadership. One skill per string, no duplicates.
+- "education" is an array of objects with keys: institution, degree, startDate, endDate. Use an empty string for unknown dates.
+- Order employment and education entries from most recent to oldest.
+- Return empty arrays rather than omitting keys.
+- Output a single JSON object with no markdown fences and no commentary.
+
+Example 1
+Resume:
+Jane Perera
+jane.perera@example.com | github.com/janeperera | linkedin.com/in/janeperera
+EXPERIENCE
+Senior Backend Engineer, Acme Logistics (Mar 2021 - Present)
+- Designed event-driven order pipeline in Python and Kafka
+- Led a team of four engineers; mentored two interns
+Software Engineer, Brightwave Labs (Jul 2018 - Feb 2021)
+- Built REST APIs with Django and PostgreSQL, deployed on AWS
+EDUCATION
+BSc (Hons) in Computer Science, University of Colombo, 2014 - 2018
+SKILLS
+Python, Django, Kafka, PostgreSQL, AWS, Docker; strong communication, team leadership
+
+Output:
+{"fullName": "Jane Perera", "email": "jane.perera@example.com", "github": "https://github.com/janeperera", "linkedin": "https://linkedin.com/in/janeperera", "employment": [{"company": "Acme Logistics", "position": "Senior Backend Engineer", "startDate": "Mar 2021", "endDate": "Present"}, {"company": "Brightwave Labs", "position": "Software Engineer", "startDate": "Jul 2018", "endDate": "Feb 2021"}], "technicalSkills": ["Python", "Django", "Kafka", "PostgreSQL", "AWS", "Docker", "REST APIs"], "softSkills": ["Communication", "Team Leadership", "Mentoring"], "education": [{"institution": "University of Colombo", "degree": "BSc (Hons) in Computer Science", "startDate": "2014", "endDate": "2018"}]}
+
+Example 2
+Resume:
+MARCUS OLIVEIRA - Data Analyst
+Email: m.oliveira@example.org
+Profile: Detail-oriented analyst who enjoys turning messy data into clear stories. Comfortable presenting to stakeholders.
+Work
+2022-now  Data Analyst @ Northwind Retail - dashboards in Power BI, SQL Server reporting, forecasting in R
+2020-2022 Junior Analyst @ Contoso Finance - Excel modelling, ad-hoc SQL
+Education
+MSc Business Analytics - University of Lisbon (2019-2020)
+BA Economics - University of Porto (2016-2019)
+Other: fluent Portuguese and English, problem solving, time management
+
+Output:
+{"fullName": "Marcus Oliveira", "email": "m.oliveira@example.org", "github": "", "linkedin": "", "employment": [{"company": "Northwind Retail", "position": "Data Analyst", "startDate": "2022", "endDate": "Present"}, {"company": "Contoso Finance", "position": "Junior Analyst", "startDate": "2020", "endDate": "2022"}], "technicalSkills": ["Power BI", "SQL Server", "SQL", "R", "Forecasting", "Excel"], "softSkills": ["Presentation", "Stakeholder Communication", "Problem Solving", "Time Management", "Attention to Detail"], "education": [{"institution": "University of Lisbon", "degree": "MSc Business Analytics", "startDate": "2019", "endDate": "2020"}, {"institution": "University of Porto", "degree": "BA Economics", "startDate": "2016", "endDate": "2019"}]}
+
+Example 3
+Resume:
+Aiko Tanaka
+Frontend developer | aiko.t@example.net | GitHub: aikotanaka
+Projects: personal portfolio built with Next.js and Tailwind CSS; open-source contributions to a React component library.
+Currently completing a Diploma in Software Engineering at Tokyo Institute of Design (expected 2025).
+Collaborative, eager to learn, adaptable.
+
+Output:
+{"fullName": "Aiko Tanaka", "email": "aiko.t@example.net", "github": "aikotanaka", "linkedin": "", "employment": [], "technicalSkills": ["Next.js", "Tailwind CSS", "React", "JavaScript"], "softSkills": ["Collaboration", "Eagerness to Learn", "Adaptability"], "education": [{"institution": "Tokyo Institute of Design", "degree": "Diploma in Software Engineering", "startDate": "", "endDate": "2025"}]}
+
+Now parse the resume provided by the user in the same way.
+"""
+
+
+def truncate_resume(resume_data):
+    if resume_encoding is not None:
+        # Resume text is plain data; "<|endoftext|>" in a PDF is not a control token
+        tokens = resume_encoding.encode(resume_data, disallowed_special=())
+        if len(tokens) <= MAX_RESUME_TOKENS:
+            return resume_data
+        logger.info(f"Truncating resume from {len(tokens)} to {MAX_RESUME_TOKENS} tokens")
+        return resume_encoding.decode(tokens[:MAX_RESUME_TOKENS])
+
+    if len(resume_data) <= MAX_RESUME_CHARS:
+        return resume_data
+    logger.info(f"Truncating resume from {len(resume_data)} to {MAX_RESUME_CHARS} characters")
+    return resume_data[:MAX_RESUME_CHARS]
+
+
+async def ats_extractor(resume_data):
     try:
         logger.info("Processing resume with OpenAI")
-        prompt = """
-        You are an AI bot designed to act as a professional for parsing resumes. You are given a resume and your job is to extract the following information:
-        1. Full Name
-        2. Email ID
-        3. GitHub Portfolio
-        4. LinkedIn ID
-        5. Employment Details (with company names, positions, and dates)
-        6. Technical Skills (as array of strings)
-        7. Soft Skills (as array of strings)
-        8. Education (with institution names, degrees, and dates)
-        
-        Return the extracted information in JSON format only, with keys: fullName, email, github, linkedin, employment, technicalSkills, softSkills, education.
-        """
-
-        openai_client = OpenAI(api_key=api_key)
-
         messages = [
-            {"role": "system", "content": prompt},
+            {"role": "system", "content": RESUME_PARSER_PROMPT},
             {"role": "user", "content": resume_data},
         ]
 
-        response = openai_client.chat.completions.create(
-            model="gpt-3.5-turbo", messages=messages, temperature=0.0, max_tokens=1500
+        response = await openai_client.chat.completions.create(
+            model=OPENAI_MODEL,
+            messages=messages,
+            temperature=0.0,
+            max_tokens=RESUME_OUTPUT_TOKENS,
+            response_format={"type": "json_object"},
         )
 
-        parsed_data = response.choices[0].message.content
+        # JSON mode guarantees a parseable object, so decode it once here
+        parsed_data = orjson.loads(response.choices[0].message.content)
         logger.info("Resume successfully parsed by OpenAI")
         return parsed_data
     except Exception as e:
@@ -112,10 +321,355 @@ def ats_extractor(resume_data):
         return {"error": str(e)}
 
 
+async def ats_batch_extractor(resumes):
+    logger.info(f"Processing batch of {len(resumes)} resumes with OpenAI")
+    sections = "\n".join(
+        f"===RESUME {i}===\n{text}" for i, text in enumerate(resumes, start=1)
+    )
+    # Batch instructions go in the user message so the system prompt prefix
+    # stays identical to single calls and keeps hitting the prompt cache
+    batch_request = (
+        f"The text below contains {len(resumes)} resumes, each starting with a "
+        f"===RESUME n=== marker. Return a JSON object with a single key "
+        f'"resumes" holding an array of {len(resumes)} objects, one per resume, '
+        f"in the same order.\n\n{sections}"
+    )
+    messages = [
+        {"role": "system", "content": RESUME_PARSER_PROMPT},
+        {"role": "user", "content": batch_request},
+    ]
+
+    response = await openai_client.chat.completions.create(
+        model=OPENAI_MODEL,
+        messages=messages,
+        temperature=0.0,
+        max_tokens=RESUME_OUTPUT_TOKENS * len(resumes),
+        response_format={"type": "json_object"},
+    )
+
+    results = orjson.loads(response.choices[0].message.content).get("resumes")
+    if not isinstance(results, list) or len(results) != len(resumes):
+        raise ValueError(f"Expected {len(resumes)} parsed resumes in batch response")
+    if not all(isinstance(result, dict) for result in results):
+        raise ValueError("Batch response contained a non-object entry")
+    return results
+
+
+class ResumeBatcher:
+    """Coalesces resumes that arrive together into a single OpenAI call."""
+
+    def __init__(
+        self,
+        max_batch_size=RESUME_BATCH_SIZE,
+        max_wait=RESUME_BATCH_WAIT,
+        max_batch_chars=RESUME_BATCH_MAX_CHARS,
+    ):
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.max_batch_chars = max_batch_chars
+        self.queue = None
+        self._in_flight = 0
+        self._runner = None
+        self._dispatches = set()
+        self._pending = set()
+
+    def start(self):
+        # Fresh state per lifespan: an asyncio.Queue binds to the first loop
+        # that waits on it, so it can't be reused across event loops
+        self.queue = asyncio.Queue()
+        self._in_flight = 0
+        self._dispatches = set()
+        self._pending = set()
+        self._runner = asyncio.create_task(self._run())
+        self._runner.add_done_callback(self._on_runner_done)
+
+    async def stop(self):
+        if self._runner is None:
+            return
+        tasks = [self._runner, *self._dispatches]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._runner = None
+
+    async def submit(self, resume_text):
+        if self._runner is None or self._runner.done():
+            raise RuntimeError("Resume batcher is not running")
+        future = asyncio.get_running_loop().create_future()
+        self._pending.add(future)
+        future.add_done_callback(self._pending.discard)
+        await self.queue.put((truncate_resume(resume_text), future))
+        return await future
+
+    def _on_runner_done(self, task):
+        error = None if task.cancelled() else task.exception()
+        if error is not None:
+            logger.error(f"Resume batcher crashed: {error!r}")
+        else:
+            error = RuntimeError("Resume batcher stopped")
+        # Nothing will pick these up any more; fail them instead of hanging
+        for future in list(self._pending):
+            if not future.done():
+                future.set_exception(error)
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        carry = None
+        while True:
+            item = carry or await self.queue.get()
+            carry = None
+            batch = [item]
+            batch_chars = len(item[0])
+
+            # Fast path: when nothing else is in flight or waiting, send the
+            # resume straight away instead of holding it for the window
+            if self._in_flight or not self.queue.empty():
+                deadline = loop.time() + self.max_wait
+                while len(batch) < self.max_batch_size:
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        item = await asyncio.wait_for(self.queue.get(), timeout)
+                    except asyncio.TimeoutError:
+                        break
+                    if batch_chars + len(item[0]) > self.max_batch_chars:
+                        carry = item
+                        break
+                    batch.append(item)
+                    batch_chars += len(item[0])
+
+            self._in_flight += 1
+            task = asyncio.create_task(self._dispatch(batch))
+            self._dispatches.add(task)
+            task.add_done_callback(self._dispatches.discard)
+
+    async def _dispatch(self, batch):
+        texts = [text for text, _ in batch]
+        try:
+            if len(batch) == 1:
+                results = [await ats_extractor(texts[0])]
+            else:
+                try:
+                    results = await ats_batch_extractor(texts)
+                except Exception as e:
+                    logger.warning(f"Batch extraction failed, parsing individually: {e}")
+                    results = await asyncio.gather(*(ats_extractor(t) for t in texts))
+
+            for (_, future), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+        finally:
+            self._in_flight -= 1
+
+
+resume_batcher = ResumeBatcher()
+
+
+def _is_retryable(exc):
+    # Retry network failures and 5xx responses; a 4xx won't fix itself
+    if isinstance(exc, httpx.HTTPStatusError):
+        return exc.response.status_code >= 500
+    return isinstance(exc, httpx.TransportError)
+
+
+@retry(
+    stop=stop_after_attempt(5),
+    wait=wait_exponential_jitter(multiplier=0.2, max=10),
+    retry=retry_if_exception(_is_retryable),
+    reraise=True,
+)
+async def _post_webhook(body, headers):
+    response = await http_client.post(
+        WEBHOOK_URL, content=body, headers=headers, timeout=10
+    )
+    response.raise_for_status()
+    return response
+
+
+async def send_webhook(data, candidate_email, cv_url: str, environment="testing"):
+    try:
+        logger.info(f"Sending webhook notification for {candidate_email}")
+        payload = {
+            "cv_data": {
+                "personal_info": {
+                    "name": data.get("fullName", ""),
+                    "email": data.get("email", candidate_email),
+                    "github": data.get("github", ""),
+                    "linkedin": data.get("linkedin", ""),
+                },
+                "education": data.get("education", []),
+                "qualifications": data.get("technicalSkills", []),
+                "projects": [],  # Not directly provided in the parsed data
+                "cv_public_link": cv_url,
+            },
+            "metadata": {
+                "applicant_name": data.get("fullName", "Unknown Candidate"),
+                "email": candidate_email,
+                "status": environment,
+                "cv_processed": True,
+                "processed_timestamp": datetime.datetime.now(
+                    datetime.timezone.utc
+                ).isoformat(),
+            },
+        }
+
+        # Add employment history if available
+        if data.get("employment"):
+            payload["cv_data"]["work_experience"] = data["employment"]
+
+        # Stable across retries (and resubmissions of the same data) so the
+        # receiver can dedupe; the timestamp is left out on purpose
+        data_hash = hashlib.sha256(
+            orjson.dumps([data, cv_url], option=orjson.OPT_SORT_KEYS)
+        ).hexdigest()
+        idempotency_key = str(uuid.uuid5(uuid.NAMESPACE_URL, f"{candidate_email}:{data_hash}"))
+
+        headers = {
+            "Content-Type": "application/json",
+            "X-Candidate-Email": candidate_email,
+            "X-Idempotency-Key": idempotency_key,
+        }
+        body = orjson.dumps(payload)
+        if WEBHOOK_GZIP:
+            body = gzip.compress(body)
+            headers["Content-Encoding"] = "gzip"
+
+        response = await _post_webhook(body, headers)
+
+        logger.info(f"Webhook notification sent successfully: {response.status_code}")
+        return {"success": True, "status": response.status_code}
+    except Exception as e:
+        logger.error(f"Error sending webhook notification: {e}")
+        return {"success": False, "status": "failed", "error": str(e)}
+
+
+async def webhook_worker():
+    while True:
+        data, candidate_email, cv_url = await webhook_queue.get()
+        start = time.perf_counter()
+        try:
+            result = await send_webhook(data, candidate_email, cv_url)
+            if not result["success"]:
+                WEBHOOK_FAILURES.inc()
+        finally:
+            WEBHOOK_LATENCY.observe(time.perf_counter() - start)
+            webhook_queue.task_done()
+
+
+def enqueue_webhook(data, candidate_email, cv_url):
+    try:
+        webhook_queue.put_nowait((data, candidate_email, cv_url))
+        return {"status": "queued"}
+    except asyncio.QueueFull:
+        WEBHOOK_DROPPED.inc()
+        logger.warning(f"Webhook queue full, dropping notification for {candidate_email}")
+        return {"status": "dropped"}
+
+
+async def find_cached_resume(url: str):
+    # Returns (parsed_data, resume_text, cache_keys); parsed_data is None on
+    # a miss and cache_keys are where the fresh result should be stored
+    url_key = f"{PROMPT_VERSION}:url:{url}"
+    cached = resume_cache.get(url_key)
+    if cached is not None:
+        logger.info("Resume cache hit for URL")
+        return orjson.loads(cached), None, ()
+
+    resume_text = await fetch_and_extract(url)
+    text_hash = hashlib.sha256(resume_text.encode()).hexdigest()
+    text_key = f"{PROMPT_VERSION}:text:{text_hash}"
+    cached = resume_cache.get(text_key)
+    if cached is not None:
+        logger.info("Resume cache hit for extracted text")
+        resume_cache[url_key] = cached
+        return orjson.loads(cached), resume_text, ()
+
+    return None, resume_text, (url_key, text_key)
+
+
+def cache_parsed_resume(parsed_data, cache_keys):
+    # Don't cache failures so the next attempt goes back to OpenAI
+    if "error" in parsed_data:
+        return
+    serialized = orjson.dumps(parsed_data)
+    for key in cache_keys:
+        resume_cache[key] = serialized
+
+
+async def get_parsed_resume(url: str) -> dict:
+    parsed_data, resume_text, cache_keys = await find_cached_resume(url)
+    if parsed_data is None:
+        parsed_data = await resume_batcher.submit(resume_text)
+        cache_parsed_resume(parsed_data, cache_keys)
+    return parsed_data
+
+
+def notify_webhook(parsed_data, cv_url):
+    # Try to extract email from parsed data
+    candidate_email = parsed_data.get("email", "")
+
+    # If we couldn't get the email from parsed data, use a fallback
+    if not candidate_email:
+        candidate_email = "candidate@example.com"  # You can adjust this fallback
+
+    # Hand the webhook notification to the worker pool
+    return enqueue_webhook(parsed_data, candidate_email, cv_url)
+
+
+def done_event(parsed_data, cv_url):
+    webhook_result = notify_webhook(parsed_data, cv_url)
+    done = {"parsed_data": parsed_data, "webhook_result": webhook_result}
+    return f"event: done\ndata: {orjson.dumps(done).decode()}\n\n"
+
+
+async def cached_resume_events(parsed_data, cv_url):
+    yield done_event(parsed_data, cv_url)
+
+
+async def stream_resume_events(resume_text, cv_url, cache_keys):
+    messages = [
+        {"role": "system", "content": RESUME_PARSER_PROMPT},
+        {"role": "user", "content": truncate_resume(resume_text)},
+    ]
+    try:
+        stream = await openai_client.chat.completions.create(
+            model=OPENAI_MODEL,
+            messages=messages,
+            temperature=0.0,
+            max_tokens=RESUME_OUTPUT_TOKENS,
+            response_format={"type": "json_object"},
+            stream=True,
+        )
+
+        chunks = []
+        async for chunk in stream:
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta.content
+            if delta:
+                chunks.append(delta)
+                yield f"data: {orjson.dumps({'delta': delta}).decode()}\n\n"
+
+        parsed_data = orjson.loads("".join(chunks))
+        cache_parsed_resume(parsed_data, cache_keys)
+        logger.info("Successfully streamed resume")
+        yield done_event(parsed_data, cv_url)
+    except Exception as e:
+        logger.error(f"Error streaming resume: {e}")
+        yield f"event: error\ndata: {orjson.dumps({'error': str(e)}).decode()}\n\n"
+
+
 origins = [
     "http://localhost:3000",  # Frontend origin
-    "*",  # For development - restrict this in production
 ]
+# Extra deployed frontends, comma separated. A wildcard is not allowed
+# together with credentials, so every origin has to be listed.
+origins += [o.strip() for o in os.getenv("CORS_ORIGINS", "").split(",") if o.strip()]
 
 app.add_middleware(
     CORSMiddleware,
@@ -123,6 +677,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    max_age=86400,  # Let browsers cache preflight responses for a day
 )
 
 
@@ -130,48 +685,17 @@ app.add_middleware(
 async def health_check():
     return {"status": "OK"}
 
+
+@app.get("/metrics")
+async def metrics():
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
 @app.post("/parse-resume/")
 async def parse_resume(resume_link: ResumeLink):
     try:
         logger.info(f"Processing resume from URL: {resume_link.url}")
-        pdf_path = download_pdf(resume_link.url)
-        resume_text = read_pdf(pdf_path)
-        parsed_data = ats_extractor(resume_text)
-
-        # Clean up the file
-        try:
-            os.remove(pdf_path)
-            logger.info(f"Removed temporary file: {pdf_path}")
-        except Exception as e:
-            logger.warning(f"Error removing temporary file: {e}")
-
-        # Try to extract email from parsed data
-        candidate_email = ""
-        candidate_data = {}
-
-        try:
-            if isinstance(parsed_data, str):
-                candidate_data = json.loads(parsed_data)
-                if "email" in candidate_data:
-                    candidate_email = candidate_data["email"]
-            elif isinstance(parsed_data, dict):
-                candidate_data = parsed_data
-                if "email" in candidate_data:
-                    candidate_email = candidate_data["email"]
-        except Exception as e:
-            logger.warning(f"Could not extract email from parsed data: {e}")
-
-        # If we couldn't get the email from parsed data, use a fallback
-        if not candidate_email:
-            candidate_email = "candidate@example.com"  # You can adjust this fallback
-
-        # Add CV URL to the parsed data
-        if isinstance(candidate_data, dict):
-            candidate_data["cvUrl"] = resume_link.url
-
-        # Send webhook notification
-        webhook_result = await send_webhook(candidate_data, candidate_email)
-        logger.info(f"Webhook notification result: {webhook_result['status']}")
+        parsed_data = await get_parsed_resume(resume_link.url)
+        webhook_result = notify_webhook(parsed_data, resume_link.url)
 
         logger.info("Successfully processed resume")
         return {"parsed_data": parsed_data, "webhook_result": webhook_result}
@@ -180,6 +704,18 @@ async def parse_resume(resume_link: ResumeLink):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.post("/parse-resume/stream")
+async def parse_resume_stream(resume_link: ResumeLink):
+    logger.info(f"Streaming resume from URL: {resume_link.url}")
+    # Download and extract up front so failures still return a proper status
+    parsed_data, resume_text, cache_keys = await find_cached_resume(resume_link.url)
+    if parsed_data is not None:
+        events = cached_resume_events(parsed_data, resume_link.url)
+    else:
+        events = stream_resume_events(resume_text, resume_link.url, cache_keys)
+    return StreamingResponse(events, media_type="text/event-stream")
+
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -0,0 +1,8 @@
+# Worker-side PDF extraction for the page-range process pool. Kept free of
+# import-time side effects because every pool process imports it.
+import pymupdf
+
+
+def extract_page_range(content: bytes, start: int, stop: int) -> str:
+    with pymupdf.open(stream=content, filetype="pdf") as doc:
+        return "\n".join(doc.load_page(i).get_text("text") for i in range(start, stop))
@@ -0,0 +1,38 @@
+import pymupdf
+from fastapi.testclient import TestClient
+
+import backend
+
+
+def make_pdf(page_count):
+    doc = pymupdf.open()
+    for i in range(page_count):
+        doc.new_page().insert_text((72, 72), f"page {i}")
+    return doc.tobytes()
+
+
+def test_short_pdf_is_extracted_inline():
+    assert backend.extract_text(make_pdf(3)) == "page 0\n\npage 1\n\npage 2"
+
+
+def test_long_pdf_uses_page_pool_across_lifespans(monkeypatch):
+    monkeypatch.setattr(backend, "PDF_PAGE_WORKERS", 2)
+    monkeypatch.setattr(backend, "PARALLEL_PAGE_THRESHOLD", 4)
+    content = make_pdf(5)
+    expected = "\n\n".join(f"page {i}" for i in range(5))
+
+    # Each lifespan gets its own pool, so a second app session still works
+    for _ in range(2):
+        with TestClient(backend.app):
+            assert backend.pdf_page_pool is not None
+            assert backend.extract_text(content) == expected
+        assert backend.pdf_page_pool is None
+
+
+def test_page_pool_is_off_by_default(monkeypatch):
+    monkeypatch.setattr(backend, "PARALLEL_PAGE_THRESHOLD", None)
+    monkeypatch.setattr(backend, "PDF_PAGE_WORKERS", 4)
+
+    with TestClient(backend.app):
+        assert backend.pdf_page_pool is None
+        assert backend.extract_text(make_pdf(5)).startswith("page 0")
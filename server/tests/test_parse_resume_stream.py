@@ -0,0 +1,105 @@
+from types import SimpleNamespace
+
+import orjson
+import pytest
+from fastapi.testclient import TestClient
+
+import backend
+
+RESUME_URL = "https://example.com/resume.pdf"
+PARSED = {"fullName": "Jane Perera", "email": "jane@example.com"}
+
+
+class FakeCompletions:
+    def __init__(self, content):
+        self.content = content
+        self.calls = 0
+
+    async def create(self, **kwargs):
+        self.calls += 1
+        assert kwargs["stream"] is True
+
+        async def stream():
+            for i in range(0, len(self.content), 8):
+                delta = SimpleNamespace(content=self.content[i : i + 8])
+                yield SimpleNamespace(choices=[SimpleNamespace(delta=delta)])
+
+        return stream()
+
+
+@pytest.fixture
+def completions(monkeypatch):
+    completions = FakeCompletions(orjson.dumps(PARSED).decode())
+    monkeypatch.setattr(
+        backend, "openai_client", SimpleNamespace(chat=SimpleNamespace(completions=completions))
+    )
+    return completions
+
+
+@pytest.fixture
+def webhooks(monkeypatch):
+    webhooks = []
+
+    def fake_enqueue_webhook(data, candidate_email, cv_url):
+        webhooks.append((candidate_email, cv_url))
+        return {"status": "queued"}
+
+    monkeypatch.setattr(backend, "enqueue_webhook", fake_enqueue_webhook)
+    return webhooks
+
+
+@pytest.fixture(autouse=True)
+def empty_cache(monkeypatch):
+    monkeypatch.setattr(backend, "resume_cache", backend.TTLCache(maxsize=10, ttl=60))
+
+
+@pytest.fixture
+def extracted(monkeypatch):
+    extracted = []
+
+    async def fake_fetch_and_extract(url):
+        extracted.append(url)
+        return "Jane Perera\njane@example.com"
+
+    monkeypatch.setattr(backend, "fetch_and_extract", fake_fetch_and_extract)
+    return extracted
+
+
+def parse_events(body):
+    events = []
+    for block in body.strip().split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in block.split("\n"))
+        events.append((fields.get("event", "message"), orjson.loads(fields["data"])))
+    return events
+
+
+def post_stream(client):
+    response = client.post("/parse-resume/stream", json={"url": RESUME_URL})
+    assert response.status_code == 200
+    return parse_events(response.text)
+
+
+def test_stream_caches_result_and_replays_it_as_single_done_event(
+    completions, webhooks, extracted
+):
+    with TestClient(backend.app) as client:
+        first = post_stream(client)
+        second = post_stream(client)
+
+    assert [name for name, _ in first[:-1]] == ["message"] * (len(first) - 1)
+    assert first[-1] == ("done", {"parsed_data": PARSED, "webhook_result": {"status": "queued"}})
+    assert second == [first[-1]]
+    assert completions.calls == 1
+    assert extracted == [RESUME_URL]
+    assert webhooks == [("jane@example.com", RESUME_URL)] * 2
+
+
+def test_stream_serves_result_cached_by_parse_resume(completions, webhooks, extracted):
+    backend.resume_cache[f"{backend.PROMPT_VERSION}:url:{RESUME_URL}"] = orjson.dumps(PARSED)
+
+    with TestClient(backend.app) as client:
+        events = post_stream(client)
+
+    assert events == [("done", {"parsed_data": PARSED, "webhook_result": {"status": "queued"}})]
+    assert completions.calls == 0
+    assert extracted == []
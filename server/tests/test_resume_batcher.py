@@ -0,0 +1,119 @@
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+
+import backend
+
+
+@pytest.fixture
+def calls(monkeypatch):
+    calls = []
+
+    async def fake_ats_extractor(resume_data):
+        calls.append(("single", resume_data))
+        return {"text": resume_data}
+
+    async def fake_ats_batch_extractor(resumes):
+        calls.append(("batch", list(resumes)))
+        return [{"text": text} for text in resumes]
+
+    monkeypatch.setattr(backend, "ats_extractor", fake_ats_extractor)
+    monkeypatch.setattr(backend, "ats_batch_extractor", fake_ats_batch_extractor)
+    monkeypatch.setattr(backend, "truncate_resume", lambda resume_data: resume_data)
+    return calls
+
+
+async def run_batcher(batcher, *resumes):
+    batcher.start()
+    try:
+        return await asyncio.gather(*(batcher.submit(text) for text in resumes))
+    finally:
+        await batcher.stop()
+
+
+def test_idle_batcher_sends_single_resume_immediately(calls):
+    batcher = backend.ResumeBatcher(max_wait=10)
+
+    results = asyncio.run(asyncio.wait_for(run_batcher(batcher, "alice"), timeout=1))
+
+    assert results == [{"text": "alice"}]
+    assert calls == [("single", "alice")]
+
+
+def test_resumes_arriving_together_are_coalesced(calls):
+    batcher = backend.ResumeBatcher(max_batch_size=2, max_wait=0.05)
+
+    results = asyncio.run(run_batcher(batcher, "alice", "bob", "carol"))
+
+    assert results == [{"text": "alice"}, {"text": "bob"}, {"text": "carol"}]
+    assert calls == [("batch", ["alice", "bob"]), ("single", "carol")]
+
+
+def test_resume_over_char_budget_is_carried_to_next_batch(calls):
+    batcher = backend.ResumeBatcher(max_batch_size=2, max_wait=0.05, max_batch_chars=8)
+
+    results = asyncio.run(run_batcher(batcher, "aaaaa", "bbbbb"))
+
+    assert results == [{"text": "aaaaa"}, {"text": "bbbbb"}]
+    assert calls == [("single", "aaaaa"), ("single", "bbbbb")]
+
+
+def test_failed_batch_falls_back_to_individual_calls(calls, monkeypatch):
+    async def failing_batch_extractor(resumes):
+        calls.append(("batch", list(resumes)))
+        raise ValueError("Expected 2 parsed resumes in batch response")
+
+    monkeypatch.setattr(backend, "ats_batch_extractor", failing_batch_extractor)
+    batcher = backend.ResumeBatcher(max_batch_size=2, max_wait=0.05)
+
+    results = asyncio.run(run_batcher(batcher, "alice", "bob"))
+
+    assert results == [{"text": "alice"}, {"text": "bob"}]
+    assert calls == [
+        ("batch", ["alice", "bob"]),
+        ("single", "alice"),
+        ("single", "bob"),
+    ]
+
+
+def test_batch_size_fits_model_output_limit():
+    assert backend.RESUME_BATCH_SIZE * backend.RESUME_OUTPUT_TOKENS <= backend.OPENAI_MAX_OUTPUT_TOKENS
+
+
+def test_parse_resume_works_across_lifespans(calls, monkeypatch):
+    async def fake_fetch_and_extract(url):
+        return f"resume at {url}"
+
+    monkeypatch.setattr(backend, "fetch_and_extract", fake_fetch_and_extract)
+    monkeypatch.setattr(backend, "enqueue_webhook", lambda *args: {"status": "queued"})
+    monkeypatch.setattr(backend, "resume_cache", backend.TTLCache(maxsize=10, ttl=60))
+
+    # A fresh queue per lifespan; reusing one would bind it to the first loop
+    for i in range(2):
+        url = f"https://example.com/{i}.pdf"
+        with TestClient(backend.app) as client:
+            response = client.post("/parse-resume/", json={"url": url})
+        assert response.status_code == 200
+        assert response.json()["parsed_data"] == {"text": f"resume at {url}"}
+
+
+def test_crashed_runner_fails_pending_submissions(calls):
+    async def run():
+        batcher = backend.ResumeBatcher()
+        batcher.start()
+        # create_task(None) raises inside _run after it has taken the item
+        batcher._dispatch = lambda batch: None
+
+        with pytest.raises(TypeError):
+            await asyncio.wait_for(batcher.submit("alice"), timeout=1)
+        with pytest.raises(RuntimeError, match="not running"):
+            await batcher.submit("bob")
+        await batcher.stop()
+
+    asyncio.run(run())
+    assert calls == []
+
+
+def test_stop_without_start_is_a_no_op():
+    asyncio.run(backend.ResumeBatcher().stop())
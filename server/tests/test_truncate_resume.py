@@ -0,0 +1,34 @@
+import backend
+
+
+class FakeEncoding:
+    """Mirrors tiktoken's encode signature, one token per character."""
+
+    def encode(self, text, *, disallowed_special="all"):
+        if disallowed_special == "all" and "<|endoftext|>" in text:
+            raise ValueError("Encountered text corresponding to disallowed special token")
+        return list(text)
+
+    def decode(self, tokens):
+        return "".join(tokens)
+
+
+def test_special_token_text_is_encoded_as_plain_text(monkeypatch):
+    monkeypatch.setattr(backend, "resume_encoding", FakeEncoding())
+    resume = "Jane Perera <|endoftext|> Python"
+
+    assert backend.truncate_resume(resume) == resume
+
+
+def test_long_resume_is_truncated_by_tokens(monkeypatch):
+    monkeypatch.setattr(backend, "resume_encoding", FakeEncoding())
+    monkeypatch.setattr(backend, "MAX_RESUME_TOKENS", 5)
+
+    assert backend.truncate_resume("<|endoftext|>") == "<|end"
+
+
+def test_falls_back_to_characters_without_encoding(monkeypatch):
+    monkeypatch.setattr(backend, "resume_encoding", None)
+    monkeypatch.setattr(backend, "MAX_RESUME_CHARS", 4)
+
+    assert backend.truncate_resume("abcdefgh") == "abcd"